@@ -1,14 +1,30 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
 import json
+import logging
 import random
+import time
+from collections import deque
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # e.g. under PyPy, which orjson does not support
+    orjson = None
+
 app = Flask(__name__)
 CORS(app)
+log = logging.getLogger(__name__)
+
+def ojsonify(obj):
+    """Build a JSON response using orjson (faster than flask.jsonify)"""
+    if orjson is None:
+        return Response(json.dumps(obj), mimetype='application/json')
+    return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                    mimetype='application/json')
 
-# Store IoT interactions
-iot_interactions = []
+# Store IoT interactions (bounded; oldest entries are dropped)
+iot_interactions = deque(maxlen=10000)
 
 # Mock recommendation data
 MOCK_MOVIES = [
@@ -22,9 +38,22 @@ MOCK_MOVIES = [
     {"id": 350, "title": "Pulp Fiction", "genres": "Crime|Drama", "rating": 4.6}
 ]
 
+# Pre-built response rows so each request only copies the picked movies
+_MOCK_TEMPLATES = [
+    {"id": m["id"], "title": m["title"], "genres": m["genres"], "score": m["rating"]}
+    for m in MOCK_MOVIES
+]
+
+# Interaction type -> (number of recommendations, response message)
+_IX_RULES = {
+    "voice": (5, "Voice command processed"),
+    "tilt": (3, "Tilt gesture recognized"),
+    "button": (3, "Button press registered")
+}
+
 @app.route('/')
 def home():
-    return jsonify({
+    return ojsonify({
         "message": "SmartFlix API Server",
         "status": "running",
         "endpoints": {
@@ -45,40 +74,24 @@ def handle_interaction():
         
         # Log interaction
         interaction = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time(),  # epoch seconds; format on read if needed
             'type': interaction_type,
             'data': interaction_data,
             'device': device
         }
         iot_interactions.append(interaction)
         
-        print(f"📱 IoT Interaction: {interaction_type} from {device}")
+        log.info("📱 IoT Interaction: %s from %s", interaction_type, device)
         
         # Generate recommendations based on interaction type
-        if interaction_type == 'voice':
-            # Simulate voice command processing
-            recommendations = get_recommendations(5, "voice")
+        rule = _IX_RULES.get(interaction_type)
+        if rule:
+            count, message = rule
             response_data = {
                 "status": "success",
-                "message": "Voice command processed",
+                "message": message,
                 "interaction": interaction_type,
-                "recommendations": recommendations
-            }
-        elif interaction_type == 'tilt':
-            recommendations = get_recommendations(3, "tilt")
-            response_data = {
-                "status": "success", 
-                "message": "Tilt gesture recognized",
-                "interaction": interaction_type,
-                "recommendations": recommendations
-            }
-        elif interaction_type == 'button':
-            recommendations = get_recommendations(3, "button")
-            response_data = {
-                "status": "success",
-                "message": "Button press registered",
-                "interaction": interaction_type,
-                "recommendations": recommendations
+                "recommendations": get_recommendations(count, interaction_type)
             }
         else:
             response_data = {
@@ -87,10 +100,10 @@ def handle_interaction():
                 "interaction": interaction_type
             }
         
-        return jsonify(response_data)
+        return ojsonify(response_data)
         
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/recommend', methods=['GET'])
 def get_recommendations_api():
@@ -101,7 +114,7 @@ def get_recommendations_api():
         
         recommendations = get_recommendations(count, "api")
         
-        return jsonify({
+        return ojsonify({
             "status": "success",
             "user_id": user_id,
             "count": len(recommendations),
@@ -109,12 +122,12 @@ def get_recommendations_api():
         })
         
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get system status"""
-    return jsonify({
+    return ojsonify({
         "status": "running",
         "iot_interactions": len(iot_interactions),
         "server_time": datetime.now().isoformat(),
@@ -123,24 +136,14 @@ def get_status():
 
 def get_recommendations(count=3, source="default"):
     """Generate mock recommendations"""
-    # Shuffle and return top N movies
-    shuffled = MOCK_MOVIES.copy()
-    random.shuffle(shuffled)
-    
-    recommendations = []
-    for movie in shuffled[:count]:
-        recommendations.append({
-            "id": movie["id"],
-            "title": movie["title"],
-            "genres": movie["genres"],
-            "score": movie["rating"],
-            "source": source
-        })
-    
-    return recommendations
+    # Sample N distinct movies without copying/shuffling the whole list
+    picks = random.sample(_MOCK_TEMPLATES, max(0, min(count, len(_MOCK_TEMPLATES))))
+    return [{**p, "source": source} for p in picks]
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)  # show interactions on the dev server
     print("🚀 Starting SmartFlix API Server...")
     print("📡 Server will run on: http://0.0.0.0:5000")
     print("💡 Make sure your ESP32 uses your computer's IP address")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    print("⚙️ For production use: gunicorn --workers=$(nproc) --threads=2 --worker-class=gthread -b 0.0.0.0:5000 wsgi:app")
+    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
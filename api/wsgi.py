@@ -0,0 +1,19 @@
+"""WSGI entry point for running the SmartFlix API under gunicorn.
+
+    cd api
+    gunicorn --workers=$(nproc) --threads=2 --worker-class=gthread -b 0.0.0.0:5000 wsgi:app
+
+Each worker keeps its own `iot_interactions` log, so /api/status reports
+per-worker counts.
+
+The API imports no C-extension ML code (torch stays in main.py /
+deep_learning), so it can also run under PyPy for higher throughput.
+orjson is CPython-only; under PyPy responses fall back to stdlib json:
+
+    pypy3 -m pip install -r requirements.txt
+    pypy3 -m gunicorn --workers=$(nproc) -b 0.0.0.0:5000 wsgi:app
+"""
+from app import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
@@ -1,9 +1,20 @@
+import io
+import logging
 import pandas as pd
 import torch
 import torch.nn as nn
 import os
 import numpy as np
 
+log = logging.getLogger(__name__)
+
+def ratings_to_arrays(user_ratings):
+    """{movie_id: rating} -> (int32 ids, int32 ratings) arrays, filled in C"""
+    n = len(user_ratings)
+    ids = np.fromiter(user_ratings.keys(), dtype=np.int32, count=n)
+    vals = np.fromiter(user_ratings.values(), dtype=np.int32, count=n)
+    return ids, vals
+
 class MF(nn.Module):
     def __init__(self, num_users, num_items, emb_size=64):
         super(MF, self).__init__()
@@ -45,10 +56,14 @@ class MFRecommender:
     def load_data(self):
         """Load MovieLens data"""
         try:
-            # Load ratings
+            # Load ratings ('::' is multi-char and forces the slow Python engine,
+            # so remap it to a tab once and parse with the C engine)
             ratings_cols = ['UserID', 'MovieID', 'Rating', 'Timestamp']
-            self.ratings = pd.read_csv('./ml-1m/ratings.dat', sep='::', 
-                                     engine='python', names=ratings_cols)
+            with open('./ml-1m/ratings.dat', 'r') as f:
+                ratings_text = f.read().replace('::', '\t')
+            self.ratings = pd.read_csv(io.StringIO(ratings_text), sep='\t', engine='c',
+                                     names=ratings_cols,
+                                     dtype={'UserID': 'int32', 'MovieID': 'int32', 'Rating': 'int8'})
             
             # Load movies
             movies_cols = ['MovieID', 'Title', 'Genres']
@@ -56,8 +71,8 @@ class MFRecommender:
                                        engine='python', names=movies_cols, 
                                        encoding='latin-1')
             
-            self.num_users = max(self.ratings.UserID.max() + 1, 10000)
-            self.num_items = self.ratings.MovieID.max() + 1
+            self.num_users = int(max(self.ratings.UserID.max() + 1, 10000))
+            self.num_items = int(self.ratings.MovieID.max() + 1)
             
             print(f"✅ Loaded {len(self.ratings)} ratings and {len(self.movies_df)} movies")
             print(f"📊 Users: {self.num_users}, Movies: {self.num_items}")
@@ -84,41 +99,88 @@ class MFRecommender:
         self.model = MF(self.num_users, self.num_items).to(self.device)
         print("✅ MF model initialized with random weights")
         self.model.eval()
+        
+        # Compile the scoring path only; training keeps the eager model. Both share
+        # the same parameters, so every training step is visible to the compiled one.
+        self._compiled = self.model
+        if hasattr(torch, 'compile'):
+            try:
+                self._compiled = torch.compile(self.model, mode='reduce-overhead')
+            except Exception as e:
+                print(f"⚠️ torch.compile unavailable, using eager MF: {e}")
+        else:
+            try:
+                self._compiled = torch.jit.script(self.model)
+            except Exception as e:
+                print(f"⚠️ TorchScript unavailable, using eager MF: {e}")
+    
+    def _score(self, users, items):
+        """Run the compiled scoring model, falling back to eager if compilation fails"""
+        try:
+            return self._compiled(users, items)
+        except Exception as e:
+            if self._compiled is self.model:
+                raise
+            print(f"⚠️ Compiled MF failed, falling back to eager: {e}")
+            self._compiled = self.model
+            return self.model(users, items)
     
     def update_user_ratings(self, user_id, user_ratings):
         """Update model with user's ratings for personalization"""
         # Ensure user_id is within bounds
         safe_user_id = min(user_id, self.num_users - 1)
-        self.user_ratings[safe_user_id] = user_ratings
+        self.user_ratings[safe_user_id] = dict(user_ratings)
         
         if user_ratings:
-            print(f"🔄 Training MF model with {len(user_ratings)} user ratings...")
-            self._train_on_user_ratings(safe_user_id, user_ratings)
+            log.info("🔄 Training MF model with %d user ratings...", len(user_ratings))
+            # Dict -> id/rating arrays in C, then one tensor build for training
+            self._train_on_user_ratings(safe_user_id, *ratings_to_arrays(user_ratings))
+    
+    def update_user_ratings_tensors(self, user_id, user_ratings, users, items, ratings):
+        """update_user_ratings with prebuilt (users, items, ratings) CPU tensors shared with NCF"""
+        safe_user_id = min(user_id, self.num_users - 1)
+        self.user_ratings[safe_user_id] = dict(user_ratings)
+        
+        if len(items):
+            log.info("🔄 Training MF model with %d user ratings...", len(items))
+            self._train_on_tensors(users, items, ratings)
     
-    def _train_on_user_ratings(self, user_id, user_ratings):
+    def update_user_ratings_delta(self, user_id, delta):
+        """Apply only newly added ratings: a single step on the new (user, movie) pairs"""
+        safe_user_id = min(user_id, self.num_users - 1)
+        self.user_ratings.setdefault(safe_user_id, {}).update(delta)
+        
+        if delta:
+            log.info("🔄 Updating MF model with %d new ratings...", len(delta))
+            self._train_on_user_ratings(safe_user_id, *ratings_to_arrays(delta), epochs=1)
+    
+    @torch.inference_mode(False)  # callers may be scoring under inference_mode
+    def _train_on_user_ratings(self, user_id, item_ids, ratings, epochs=5):
         """Quick training on user's ratings"""
-        if not user_ratings:
+        # Array -> tensor without a per-rating Python loop
+        items = torch.from_numpy(item_ids.astype(np.int64))
+        users = torch.full_like(items, user_id)
+        self._train_on_tensors(users, items, torch.from_numpy(ratings.astype(np.float32)), epochs)
+    
+    @torch.inference_mode(False)
+    def _train_on_tensors(self, users, items, ratings, epochs=5):
+        """Train on (users, items, ratings) tensors"""
+        # Copy first (non_blocking overlaps the H2D copy when the inputs are pinned),
+        # then filter movie IDs to be within bounds on the device
+        items = items.to(self.device, non_blocking=True)
+        keep = items < self.num_items
+        if not keep.any():
             return
+        item_tensor = items[keep]
+        rating_tensor = ratings.to(self.device, non_blocking=True)[keep]
+        user_tensor = users.to(self.device, non_blocking=True)[keep].clamp(max=self.num_users - 1)
             
         self.model.train()
         optimizer = torch.optim.Adam(self.model.parameters(), lr=0.01)
         loss_fn = nn.MSELoss()
         
-        # Convert ratings to tensors and ensure they're within bounds
-        safe_user_id = min(user_id, self.num_users - 1)
-        user_tensor = torch.LongTensor([safe_user_id] * len(user_ratings)).to(self.device)
-        
-        # Filter movie IDs to be within bounds
-        valid_movie_ids = [mid for mid in user_ratings.keys() if mid < self.num_items]
-        if not valid_movie_ids:
-            return
-            
-        item_tensor = torch.LongTensor(valid_movie_ids).to(self.device)
-        rating_values = [user_ratings[mid] for mid in valid_movie_ids]
-        rating_tensor = torch.FloatTensor(rating_values).to(self.device)
-        
         # Quick training (few epochs)
-        for epoch in range(5):  # Reduced epochs for speed
+        for epoch in range(epochs):  # Reduced epochs for speed
             optimizer.zero_grad()
             predictions = self.model(user_tensor, item_tensor)
             loss = loss_fn(predictions, rating_tensor)
@@ -132,20 +194,20 @@ class MFRecommender:
         # Ensure user_id is within bounds
         safe_user_id = min(user_id, self.num_users - 1)
         
-        print(f"🎯 Generating PERSONALIZED MF recommendations for user {safe_user_id}...")
+        log.info("🎯 Generating PERSONALIZED MF recommendations for user %s...", safe_user_id)
         
         # Update model with latest user ratings
         if safe_user_id in self.user_ratings:
             current_ratings = self.user_ratings[safe_user_id]
             if current_ratings:
-                self._train_on_user_ratings(safe_user_id, current_ratings)
+                self._train_on_user_ratings(safe_user_id, *ratings_to_arrays(current_ratings))
         
         try:
             with torch.no_grad():
                 user_tensor = torch.LongTensor([safe_user_id] * self.num_items).to(self.device)
                 movie_tensor = torch.LongTensor(range(self.num_items)).to(self.device)
                 
-                predictions = self.model(user_tensor, movie_tensor).cpu().numpy()
+                predictions = self._score(user_tensor, movie_tensor).cpu().numpy()
             
             # Filter out movies user already rated
             rated_movies = set()
@@ -1,9 +1,29 @@
+import copy
+import io
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
 import torch
 import torch.nn as nn
 import os
 import numpy as np
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
+log = logging.getLogger(__name__)
+
+REC_CACHE_TTL = 300  # seconds a cached top-k stays valid in Redis
+LOCAL_CACHE_SIZE = 1024  # entries kept by the in-process fallback cache
+
 class NCF(nn.Module):
     def __init__(self, num_users, num_items, emb_size=64, hidden_layers=[128, 64, 32]):
         super(NCF, self).__init__()
@@ -27,18 +47,68 @@ class NCF(nn.Module):
         # Initialize weights
         self.user_emb.weight.data.uniform_(-0.01, 0.01)
         self.item_emb.weight.data.uniform_(-0.01, 0.01)
+        
+        # Kaiming init suits the ReLU MLP and lets short fine-tuning converge faster
+        for m in self.mlp:
+            if isinstance(m, nn.Linear):
+                nn.init.kaiming_normal_(m.weight, nonlinearity='relu')
+                nn.init.zeros_(m.bias)
     
     def forward(self, users, items):
-        # Ensure indices are within bounds
-        users = torch.clamp(users, 0, self.num_users - 1)
-        items = torch.clamp(items, 0, self.num_items - 1)
-        
+        # Callers must pass in-range indices; use safe_forward for user input
         user_emb = self.user_emb(users)
         item_emb = self.item_emb(items)
         
         # Concatenate user and item embeddings
         interaction = torch.cat([user_emb, item_emb], dim=1)
         return self.mlp(interaction).squeeze()
+    
+    def safe_forward(self, users, items):
+        """Clamp indices into range, then score (for user-supplied ids)"""
+        users = torch.clamp(users, 0, self.num_users - 1)
+        items = torch.clamp(items, 0, self.num_items - 1)
+        return self.forward(users, items)
+
+class BatchingDispatcher:
+    """Coalesce concurrent scoring requests into one batched forward pass"""
+    def __init__(self, score_fn, max_batch=8, max_delay_ms=5):
+        self.score_fn = score_fn  # list of user ids -> (B, num_items) scores
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="ncf-batcher", daemon=True)
+        self._worker.start()
+    
+    def submit(self, user_id):
+        """Queue a user for scoring; the Future resolves to that user's score row"""
+        future = Future()
+        self._queue.put((user_id, future))
+        return future
+    
+    def _run(self):
+        while True:
+            # Block for the first request; only when others are already queued,
+            # gather more for up to max_delay (a lone request is scored right away)
+            batch = [self._queue.get()]
+            if not self._queue.empty():
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+            
+            try:
+                rows = self.score_fn([user_id for user_id, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), row in zip(batch, rows):
+                future.set_result(row)
 
 class NCFRecommender:
     def __init__(self):
@@ -47,15 +117,31 @@ class NCFRecommender:
         self.load_data()
         self.model = None
         self.user_ratings = {}  # Store user ratings for training
+        self._ratings_hash = {}  # user_id -> hash of ratings last trained on
+        self._trainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ncf-train")
+        self._weights_lock = threading.Lock()
+        self._weights_version = 0  # bumped under _weights_lock whenever the scoring weights change
+        self._init_rec_cache()
         self.load_model()
+
+        # Reusable inference inputs (avoid per-request allocation + H2D copy)
+        self._all_items = torch.arange(self.num_items, device=self.device)
+        self._user_buf = torch.empty_like(self._all_items)
+        self._batcher = None  # started by the first concurrent caller (see get_recommendations)
+        self._inflight = 0  # get_recommendations calls currently scoring
+        self._inflight_lock = threading.Lock()
         
     def load_data(self):
         """Load MovieLens data"""
         try:
-            # Load ratings
+            # Load ratings ('::' is multi-char and forces the slow Python engine,
+            # so remap it to a tab once and parse with the C engine)
             ratings_cols = ['UserID', 'MovieID', 'Rating', 'Timestamp']
-            self.ratings = pd.read_csv('./ml-1m/ratings.dat', sep='::', 
-                                     engine='python', names=ratings_cols)
+            with open('./ml-1m/ratings.dat', 'r') as f:
+                ratings_text = f.read().replace('::', '\t')
+            self.ratings = pd.read_csv(io.StringIO(ratings_text), sep='\t', engine='c',
+                                     names=ratings_cols,
+                                     dtype={'UserID': 'int32', 'MovieID': 'int32', 'Rating': 'int8'})
             
             # Load movies
             movies_cols = ['MovieID', 'Title', 'Genres']
@@ -63,8 +149,8 @@ class NCFRecommender:
                                        engine='python', names=movies_cols, 
                                        encoding='latin-1')
             
-            self.num_users = max(self.ratings.UserID.max() + 1, 10000)
-            self.num_items = self.ratings.MovieID.max() + 1
+            self.num_users = int(max(self.ratings.UserID.max() + 1, 10000))
+            self.num_items = int(self.ratings.MovieID.max() + 1)
             
             print(f"✅ Loaded {len(self.ratings)} ratings and {len(self.movies_df)} movies")
             
@@ -84,117 +170,262 @@ class NCFRecommender:
             })
             self.num_users = 10000
             self.num_items = 4000
+
+        # Lookup structures for O(1) movie membership / metadata access
+        self._valid_movie_ids = set(map(int, self.movies_df['MovieID'].values))
+        self._movie_dict = {int(r.MovieID): {'Title': r.Title, 'Genres': r.Genres}
+                            for r in self.movies_df.itertuples()}
+        self._valid_mask = torch.zeros(self.num_items, dtype=torch.bool, device=self.device)
+        self._valid_mask[[mid for mid in self._valid_movie_ids if mid < self.num_items]] = True
     
     def load_model(self):
         """Load or create model"""
         self.model = NCF(self.num_users, self.num_items).to(self.device)
         print("✅ NCF model initialized with random weights")
         self.model.eval()
+        self._optimizer = torch.optim.Adam(self.model.parameters(), lr=0.01)
+        
+        # Half-precision copy used only for scoring; training stays in FP32
+        infer_dtype = torch.bfloat16 if self.device.type == 'cpu' else torch.float16
+        self._infer_model = copy.deepcopy(self.model).to(infer_dtype)
+        self._infer_model.eval()
+        
+        # Compile the fixed-shape scoring path; training keeps the eager model.
+        # TorchScript (older torch) shares the copy's parameters, so weight syncs still apply;
+        # optimize_for_inference is skipped because freezing would bake the weights in.
+        self._compiled = self._infer_model
+        if hasattr(torch, 'compile'):
+            try:
+                self._compiled = torch.compile(self._infer_model, mode='reduce-overhead',
+                                               fullgraph=True, dynamic=False)
+            except Exception as e:
+                print(f"⚠️ torch.compile unavailable, using eager NCF: {e}")
+        else:
+            try:
+                self._compiled = torch.jit.script(self._infer_model)
+            except Exception as e:
+                print(f"⚠️ TorchScript unavailable, using eager NCF: {e}")
     
     def update_user_ratings(self, user_id, user_ratings):
         """Update model with user's ratings for personalization"""
         # Ensure user_id is within bounds
         safe_user_id = min(user_id, self.num_users - 1)
-        self.user_ratings[safe_user_id] = user_ratings
+        self.user_ratings[safe_user_id] = dict(user_ratings)  # own copy: callers keep editing theirs
         
         if user_ratings:
-            print(f"🔄 Training NCF model with {len(user_ratings)} user ratings...")
-            self._train_on_user_ratings(safe_user_id, user_ratings)
+            log.info("🔄 Training NCF model with %d user ratings...", len(user_ratings))
+            self._ratings_hash[safe_user_id] = self._hash_ratings(user_ratings)
+            # Run on the trainer thread so it never overlaps a background update
+            self._trainer.submit(self._train_on_user_ratings, safe_user_id, dict(user_ratings)).result()
+    
+    def update_user_ratings_tensors(self, user_id, user_ratings, users, items, ratings):
+        """update_user_ratings with prebuilt (users, items, ratings) CPU tensors shared with MF"""
+        safe_user_id = min(user_id, self.num_users - 1)
+        self.user_ratings[safe_user_id] = dict(user_ratings)
+        
+        if user_ratings:
+            log.info("🔄 Training NCF model with %d user ratings...", len(user_ratings))
+            self._ratings_hash[safe_user_id] = self._hash_ratings(user_ratings)
+            self._trainer.submit(self._train_on_tensors, users, items, ratings).result()
+    
+    def update_user_ratings_delta(self, user_id, delta):
+        """Apply only newly added ratings: a single step on the new (user, movie) pairs"""
+        safe_user_id = min(user_id, self.num_users - 1)
+        user_ratings = self.user_ratings.setdefault(safe_user_id, {})
+        user_ratings.update(delta)
+        
+        if delta:
+            log.info("🔄 Updating NCF model with %d new ratings...", len(delta))
+            self._ratings_hash[safe_user_id] = self._hash_ratings(user_ratings)
+            self._trainer.submit(self._train_on_user_ratings, safe_user_id, dict(delta), 1).result()
+    
+    def _init_rec_cache(self):
+        """Cache top-k results in Redis when reachable, else in an in-process LRU"""
+        self._rcache = None
+        # Weights are randomly initialised per process, so Redis entries from another run never apply
+        self._cache_ns = uuid.uuid4().hex[:12]
+        self._local_cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # callers may come from several threads
+        if redis is None:
+            return
+        try:
+            client = redis.Redis(decode_responses=True)
+            client.ping()
+            self._rcache = client
+            print("✅ Redis recommendation cache connected")
+        except Exception as e:
+            print(f"⚠️ Redis unavailable, using in-process cache: {e}")
+    
+    def _cache_get(self, key):
+        if self._rcache is not None:
+            try:
+                cached = self._rcache.get(key)
+                return json.loads(cached) if cached else None
+            except Exception:
+                return None
+        with self._cache_lock:
+            cached = self._local_cache.get(key)
+            if cached is not None:
+                self._local_cache.move_to_end(key)
+            return cached
+    
+    def _cache_set(self, key, recommendations):
+        if self._rcache is not None:
+            try:
+                self._rcache.setex(key, REC_CACHE_TTL, json.dumps(recommendations))
+            except Exception:
+                pass
+            return
+        with self._cache_lock:
+            self._local_cache[key] = recommendations
+            self._local_cache.move_to_end(key)
+            while len(self._local_cache) > LOCAL_CACHE_SIZE:
+                self._local_cache.popitem(last=False)
+    
+    @staticmethod
+    def _hash_ratings(user_ratings):
+        return hash(frozenset(user_ratings.items()))
     
-    def _train_on_user_ratings(self, user_id, user_ratings):
+    def _train_on_user_ratings(self, user_id, user_ratings, epochs=2):
         """Quick training on user's ratings"""
         if not user_ratings:
             return
-            
-        self.model.train()
-        optimizer = torch.optim.Adam(self.model.parameters(), lr=0.01)
-        loss_fn = nn.MSELoss()
         
-        # Convert ratings to tensors and ensure they're within bounds
-        safe_user_id = min(user_id, self.num_users - 1)
-        user_tensor = torch.LongTensor([safe_user_id] * len(user_ratings)).to(self.device)
-        
-        # Filter movie IDs to be within bounds
-        valid_movie_ids = [mid for mid in user_ratings.keys() if mid < self.num_items]
-        if not valid_movie_ids:
+        # Convert ratings to tensors (filled in C, no per-rating Python loop)
+        n = len(user_ratings)
+        items = torch.from_numpy(np.fromiter(user_ratings.keys(), dtype=np.int64, count=n))
+        ratings = torch.from_numpy(np.fromiter(user_ratings.values(), dtype=np.float32, count=n))
+        self._train_on_tensors(torch.full_like(items, user_id), items, ratings, epochs)
+    
+    def _train_on_tensors(self, users, items, ratings, epochs=2):
+        """Train on (users, items, ratings) tensors, then refresh the scoring copy"""
+        # Copy first (non_blocking overlaps the H2D copy when the inputs are pinned),
+        # then filter movie IDs to be within bounds on the device
+        items = items.to(self.device, non_blocking=True)
+        keep = items < self.num_items
+        if not keep.any():
             return
+        item_tensor = items[keep]
+        rating_tensor = ratings.to(self.device, non_blocking=True)[keep]
+        user_tensor = users.to(self.device, non_blocking=True)[keep].clamp(max=self.num_users - 1)
             
-        item_tensor = torch.LongTensor(valid_movie_ids).to(self.device)
-        rating_values = [user_ratings[mid] for mid in valid_movie_ids]
-        rating_tensor = torch.FloatTensor(rating_values).to(self.device)
+        self.model.train()
+        optimizer = self._optimizer
+        loss_fn = nn.MSELoss()
         
         # Quick training (few epochs)
-        for epoch in range(5):  # Reduced epochs for speed
+        for epoch in range(epochs):  # Few epochs suffice with Kaiming-initialized MLP
             optimizer.zero_grad()
-            predictions = self.model(user_tensor, item_tensor)
+            predictions = self.model.safe_forward(user_tensor, item_tensor)
             loss = loss_fn(predictions, rating_tensor)
             loss.backward()
             optimizer.step()
         
         self.model.eval()
+        # Sync trained FP32 weights into the half-precision scoring copy
+        # (the version bump retires every cached list: the MLP/item weights are shared by all users)
+        with self._weights_lock:
+            self._infer_model.load_state_dict(self.model.state_dict())
+            self._weights_version += 1
+    
+    def _score(self, users, items):
+        """Run the compiled scoring model, falling back to eager if compilation fails"""
+        try:
+            return self._compiled(users, items)
+        except Exception as e:
+            if self._compiled is self._infer_model:
+                raise
+            print(f"⚠️ Compiled NCF failed, falling back to eager: {e}")
+            self._compiled = self._infer_model
+            return self._infer_model(users, items)
+    
+    def _score_users(self, user_ids):
+        """Score every movie for each user id in one forward pass -> (B, num_items)"""
+        with self._weights_lock, torch.inference_mode():
+            if len(user_ids) == 1:
+                self._user_buf.fill_(user_ids[0])
+                return self._score(self._user_buf, self._all_items).float().unsqueeze(0)
+            users = torch.tensor(user_ids, device=self.device).repeat_interleave(self.num_items)
+            items = self._all_items.repeat(len(user_ids))
+            return self._score(users, items).float().view(len(user_ids), self.num_items)
     
     def get_recommendations(self, user_id, top_k=3):
         """Get recommendations for user - PERSONALIZED based on ratings"""
         # Ensure user_id is within bounds
-        safe_user_id = min(user_id, self.num_users - 1)
+        safe_user_id = min(max(user_id, 0), self.num_users - 1)
         
-        print(f"🎯 Generating PERSONALIZED NCF recommendations for user {safe_user_id}...")
+        log.info("🎯 Generating PERSONALIZED NCF recommendations for user %s...", safe_user_id)
         
-        # Update model with latest user ratings
-        if safe_user_id in self.user_ratings:
-            current_ratings = self.user_ratings[safe_user_id]
-            if current_ratings:
-                self._train_on_user_ratings(safe_user_id, current_ratings)
+        # Retrain only if ratings changed since the last training pass; this runs
+        # in the background and the current request uses the previous weights
+        current_ratings = self.user_ratings.get(safe_user_id)
+        if current_ratings:
+            ratings_hash = self._hash_ratings(current_ratings)
+            if ratings_hash != self._ratings_hash.get(safe_user_id):
+                self._ratings_hash[safe_user_id] = ratings_hash
+                self._trainer.submit(self._train_on_user_ratings, safe_user_id, dict(current_ratings))
+        
+        weights_version = self._weights_version
+        cache_key = (f"rec:{self._cache_ns}:{weights_version}:{safe_user_id}:{top_k}:"
+                     f"{self._hash_ratings(current_ratings or {})}")
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            with torch.no_grad():
-                user_tensor = torch.LongTensor([safe_user_id] * self.num_items).to(self.device)
-                movie_tensor = torch.LongTensor(range(self.num_items)).to(self.device)
-                
-                predictions = self.model(user_tensor, movie_tensor).cpu().numpy()
-            
             # Filter out movies user already rated
-            rated_movies = set()
+            rated_movies = []
             if safe_user_id in self.user_ratings:
-                rated_movies = set(self.user_ratings[safe_user_id].keys())
-            
-            # Get top recommendations (excluding rated movies)
-            valid_movies = []
-            valid_predictions = []
+                rated_movies = [mid for mid in self.user_ratings[safe_user_id] if mid < self.num_items]
             
-            for mid in range(min(self.num_items, 1000)):  # Limit to first 1000 movies for speed
-                if mid in rated_movies:
-                    continue  # Skip movies user already rated
-                try:
-                    # Check if movie exists in our dataset
-                    if mid in self.movies_df.MovieID.values:
-                        valid_movies.append(mid)
-                        valid_predictions.append(predictions[mid])
-                except:
-                    continue
+            # A lone caller scores directly; concurrent callers go through the batcher
+            with self._inflight_lock:
+                self._inflight += 1
+                concurrent = self._inflight > 1
+                if concurrent and self._batcher is None:
+                    self._batcher = BatchingDispatcher(self._score_users)
+            try:
+                if concurrent:
+                    scores = self._batcher.submit(safe_user_id).result()
+                else:
+                    scores = self._score_users([safe_user_id])[0]
+            finally:
+                with self._inflight_lock:
+                    self._inflight -= 1
             
-            if not valid_movies:
-                return self._get_fallback_recommendations()
+            with torch.inference_mode():
+                # Mask out unknown and already rated movies, then rank on-device
+                mask = self._valid_mask.clone()
+                if rated_movies:
+                    mask[rated_movies] = False
+                scores = scores.masked_fill(~mask, float('-inf'))
+                k = min(top_k, int(mask.sum()))
+                if k == 0:
+                    return self._get_fallback_recommendations()
+                top_scores, top_idx = torch.topk(scores, k)
             
-            # Get top indices
-            top_indices = np.argsort(valid_predictions)[-top_k:][::-1]
-            top_movie_ids = [valid_movies[idx] for idx in top_indices]
+            top_movie_ids = top_idx.cpu().tolist()
+            top_scores = top_scores.cpu().tolist()
             
             recommendations = []
-            for mid in top_movie_ids:
-                try:
-                    movie_info = self.movies_df[self.movies_df['MovieID'] == mid].iloc[0]
-                    recommendations.append({
-                        'id': int(mid),
-                        'title': movie_info['Title'],
-                        'genres': movie_info['Genres'],
-                        'score': float(predictions[mid]),
-                        'model': 'Neural CF'
-                    })
-                except:
+            for mid, score in zip(top_movie_ids, top_scores):
+                info = self._movie_dict.get(mid)
+                if info is None:
                     continue
+                recommendations.append({
+                    'id': int(mid),
+                    'title': info['Title'],
+                    'genres': info['Genres'],
+                    'score': float(score),
+                    'model': 'Neural CF'
+                })
             
-            return recommendations if recommendations else self._get_fallback_recommendations()
+            if not recommendations:
+                return self._get_fallback_recommendations()
+            # a retrain that landed while scoring may have produced these; don't cache them
+            if weights_version == self._weights_version:
+                self._cache_set(cache_key, recommendations)
+            return recommendations
             
         except Exception as e:
             print(f"❌ Error in NCF recommendations: {e}")
@@ -1,10 +1,60 @@
+import asyncio
 import random
-import time
 import threading
+import time
 from datetime import datetime
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+SERIAL_READY_TIMEOUT = 2.0  # max seconds to wait for the board after opening the port
+SERIAL_EVENT_BACKLOG = 32  # serial lines kept for the UI before the oldest are dropped
+
+# Packed numeric sensor state: one float32 slot per reading
+TILT_X, TILT_Y, TILT_Z, MIC_VOLUME, TEMPERATURE, MEMORY_USAGE = range(6)
+_SENSOR_LO = np.array([-0.5, -0.5, 0.8, 0.0, 20.0, 40.0], dtype=np.float32)
+_SENSOR_HI = np.array([0.5, 0.5, 1.2, 100.0, 35.0, 75.0], dtype=np.float32)
+
+if njit is not None:
+    @njit(cache=True)
+    def _gen_sensor_tick(out, lo, hi):
+        """Fill out[i] with a uniform reading in [lo[i], hi[i])"""
+        for i in range(out.shape[0]):
+            out[i] = np.random.uniform(lo[i], hi[i])
+else:
+    _rng = np.random.default_rng()
+
+    def _gen_sensor_tick(out, lo, hi):
+        """Fill out[i] with a uniform reading in [lo[i], hi[i])"""
+        _rng.random(out=out, dtype=np.float32)
+        out *= hi - lo
+        out += lo
+
+# Console feedback per interaction, printed by announce_interaction(s)
+_MULTI_SENSORY_STEPS = (
+    "   🎤 Listening for voice command...",
+    "   📱 Detecting tilt gesture...",
+    "   🔘 Button pressed for confirmation...",
+    "   ✅ Multi-sensory interaction completed",
+)
+_INTERACTION_MESSAGES = {
+    "voice_command": ("🎤 Voice Command: 'Show me action movies'",),
+    "tilt_gesture": ("📱 Tilt Gesture: Navigating through recommendations",),
+    "button_press": ("🔘 Button Press: Refreshing recommendations",),
+    "multi_sensory": ("🔄 Multi-Sensory: Voice + Tilt + Button combined",) + _MULTI_SENSORY_STEPS,
+}
+
 class IoTDevice:
-    def __init__(self):
+    def __init__(self, port='COM6', baudrate=9600):
         self.recommendation_count = 0
         self.voice_commands = 0
         self.tilt_gestures = 0
@@ -12,55 +62,116 @@ class IoTDevice:
         self.multi_sensory = 0
         self.last_update = datetime.now()
         self.running = False
-        self.thread = None
+        
+        # Arduino serial link (opened and read by run())
+        self.port = port
+        self.baudrate = baudrate
+        self.ser = None
+        self._ser_lock = threading.Lock()  # stop() vs. a still-running _open_serial()
+        # Lines received from the board, created by run() on its event loop
+        self.events = None
         
         # ESP32 Sensor Simulation
         self.sensors = {
-            'mpu6050_tilt': {'x': 0.0, 'y': 0.0, 'z': 1.0},
-            'microphone': {'listening': False, 'volume': 0},
+            'microphone': {'listening': False},
             'button': {'pressed': False, 'press_count': 0},
             'oled': {'displaying': True, 'brightness': 100},
             'led': {'color': 'blue', 'blinking': False}
         }
         
+        # Numeric readings (tilt x/y/z, mic volume, temperature, memory usage)
+        self._sensor_state = np.array([0.0, 0.0, 1.0, 0.0, 25.0, 45.0], dtype=np.float32)
+        
         # System status
         self.system_status = "ready"
-        self.temperature = 25.0
-        self.memory_usage = 45.0
         
         print("📱 IoT Device (ESP32) Initialized")
     
     def start(self):
         """Start IoT device simulation"""
         self.running = True
-        self.thread = threading.Thread(target=self._sensor_loop, daemon=True)
-        self.thread.start()
         print("✅ IoT Device Started - Sensors Active")
         return True
     
+    async def run(self):
+        """Open the serial link and feed incoming lines into self.events until stopped"""
+        self.events = asyncio.Queue(maxsize=SERIAL_EVENT_BACKLOG)
+        # Opening the port and waiting for the board happen off the event loop
+        await asyncio.to_thread(self._open_serial)
+        while self.running and self.ser is not None:
+            try:
+                line = await asyncio.to_thread(self._read_line)
+            except Exception:
+                break  # port closed or unplugged
+            if not line:
+                continue
+            if self.events.full():
+                self.events.get_nowait()  # keep the newest events
+            self.events.put_nowait(line)
+    
+    def _read_line(self):
+        """One decoded serial line, or '' after the port timeout"""
+        ser = self.ser
+        if ser is None:
+            return ''
+        return ser.readline().decode(errors='ignore').strip()
+    
     def stop(self):
         """Stop IoT device"""
-        self.running = False
+        with self._ser_lock:
+            self.running = False
+            if self.ser is not None:
+                try:
+                    self.ser.close()
+                except Exception:
+                    pass
+                self.ser = None
         print("🛑 IoT Device Stopped")
     
-    def _sensor_loop(self):
-        """Simulate sensor data updates"""
-        while self.running:
-            # Update tilt sensor data (simulate gentle movement)
-            self.sensors['mpu6050_tilt'] = {
-                'x': random.uniform(-0.5, 0.5),
-                'y': random.uniform(-0.5, 0.5), 
-                'z': random.uniform(0.8, 1.2)
-            }
-            
-            # Update microphone volume
-            self.sensors['microphone']['volume'] = random.uniform(0, 100)
-            
-            # Update system metrics
-            self.temperature = random.uniform(20.0, 35.0)
-            self.memory_usage = random.uniform(40.0, 75.0)
-            
-            time.sleep(2)  # Update every 2 seconds
+    def _open_serial(self):
+        """Open the Arduino serial port and wait (capped) for its ready banner"""
+        if serial is None:
+            print("⚠️ pyserial not installed - running without hardware")
+            return
+        try:
+            ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
+        except Exception as e:
+            print(f"⚠️ Serial port {self.port} unavailable - running without hardware: {e}")
+            return
+        
+        # Opening the port resets the board; poll for its "Ready" line instead of sleeping
+        deadline = time.monotonic() + SERIAL_READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if ser.in_waiting and b"Ready" in ser.readline():
+                break
+            time.sleep(0.05)
+        
+        with self._ser_lock:
+            if not self.running:
+                # stop() ran while we waited for the board: nobody else will close this port
+                ser.close()
+                return
+            self.ser = ser
+        print(f"✅ Serial Port Opened: {ser.name}")
+    
+    def _refresh_sensors(self):
+        """Simulate sensor data updates (generated on read, no polling thread)"""
+        if not self.running:
+            return
+        
+        # Tilt (gentle movement), microphone volume and system metrics in one pass
+        _gen_sensor_tick(self._sensor_state, _SENSOR_LO, _SENSOR_HI)
+    
+    @property
+    def temperature(self):
+        return float(self._sensor_state[TEMPERATURE])
+    
+    @property
+    def memory_usage(self):
+        return float(self._sensor_state[MEMORY_USAGE])
+    
+    def _set_tilt(self, x, y, z):
+        self._sensor_state[TILT_X:TILT_Z + 1] = (x, y, z)
     
     def get_status(self):
         """Get simple status - ADD THIS METHOD"""
@@ -70,59 +181,91 @@ class IoTDevice:
             "interactions": self.get_total_interactions()
         }
     
-    def record_interaction(self, interaction_type):
-        """Record different IoT interactions"""
+    def announce_interaction(self, interaction_type):
+        """Print the console feedback for one interaction (without its simulated delays)"""
+        messages = _INTERACTION_MESSAGES.get(interaction_type)
+        if messages:
+            print("\n".join(messages))
+    
+    def announce_interactions(self, events):
+        """Print the console feedback for a batch recorded by record_interactions()"""
+        print("\n".join((f"📡 Batched Interactions: {', '.join(events)}",) + _MULTI_SENSORY_STEPS))
+    
+    def record_interaction(self, interaction_type, verbose=True):
+        """Record different IoT interactions (verbose=False: counters and sensor delays only)"""
         self.last_update = datetime.now()
+        if verbose:
+            self.announce_interaction(interaction_type)
         
         if interaction_type == "voice_command":
             self.voice_commands += 1
             self.sensors['microphone']['listening'] = True
-            print("🎤 Voice Command: 'Show me action movies'")
             time.sleep(1)
             self.sensors['microphone']['listening'] = False
             
         elif interaction_type == "tilt_gesture":
             self.tilt_gestures += 1
-            print("📱 Tilt Gesture: Navigating through recommendations")
             # Simulate tilt data
-            self.sensors['mpu6050_tilt'] = {
-                'x': random.uniform(-1.0, 1.0),
-                'y': random.uniform(-1.0, 1.0),
-                'z': random.uniform(0.5, 1.5)
-            }
+            self._set_tilt(random.uniform(-1.0, 1.0),
+                           random.uniform(-1.0, 1.0),
+                           random.uniform(0.5, 1.5))
             
         elif interaction_type == "button_press":
             self.button_presses += 1
             self.sensors['button']['press_count'] += 1
             self.sensors['button']['pressed'] = True
-            print("🔘 Button Press: Refreshing recommendations")
             time.sleep(0.5)
             self.sensors['button']['pressed'] = False
             
         elif interaction_type == "multi_sensory":
             self.multi_sensory += 1
-            print("🔄 Multi-Sensory: Voice + Tilt + Button combined")
-            self.simulate_multi_sensory()
+            self.simulate_multi_sensory(verbose=False)  # steps were announced above
         
         self.recommendation_count += 1
     
-    def simulate_multi_sensory(self):
+    def record_interactions(self, events, verbose=True):
+        """Record a batch of interactions with one update and one combined sensor pass"""
+        self.last_update = datetime.now()
+        if verbose:
+            self.announce_interactions(events)
+        
+        for interaction_type in events:
+            if interaction_type == "voice_command":
+                self.voice_commands += 1
+            elif interaction_type == "tilt_gesture":
+                self.tilt_gestures += 1
+            elif interaction_type == "button_press":
+                self.button_presses += 1
+                self.sensors['button']['press_count'] += 1
+            elif interaction_type == "multi_sensory":
+                self.multi_sensory += 1
+            self.recommendation_count += 1
+        
+        # One pass drives mic, tilt and button instead of one actuation per event
+        self.simulate_multi_sensory(verbose=False)
+    
+    def simulate_multi_sensory(self, verbose=True):
         """Simulate combined sensor interaction"""
-        print("   🎤 Listening for voice command...")
+        listening, tilting, pressing, done = _MULTI_SENSORY_STEPS
+        if verbose:
+            print(listening)
         self.sensors['microphone']['listening'] = True
         time.sleep(1)
         
-        print("   📱 Detecting tilt gesture...")
-        self.sensors['mpu6050_tilt'] = {'x': 0.8, 'y': -0.3, 'z': 1.1}
+        if verbose:
+            print(tilting)
+        self._set_tilt(0.8, -0.3, 1.1)
         time.sleep(1)
         
-        print("   🔘 Button pressed for confirmation...")
+        if verbose:
+            print(pressing)
         self.sensors['button']['pressed'] = True
         time.sleep(0.5)
         self.sensors['button']['pressed'] = False
         self.sensors['microphone']['listening'] = False
         
-        print("   ✅ Multi-sensory interaction completed")
+        if verbose:
+            print(done)
     
     def display_message(self, message):
         """Simulate OLED display"""
@@ -143,6 +286,7 @@ class IoTDevice:
     
     def show_detailed_status(self):
         """Show detailed IoT status"""
+        self._refresh_sensors()
         print("\n" + "="*60)
         print("📱 SMARTFLIX IOT DEVICE STATUS (ESP32 SIMULATION)")
         print("="*60)
@@ -161,10 +305,10 @@ class IoTDevice:
         print(f"   🎬 Recommendations Generated: {self.recommendation_count}")
         
         print("\n🔧 SENSOR STATUS:")
-        tilt = self.sensors['mpu6050_tilt']
-        print(f"   📱 MPU6050 Tilt: X:{tilt['x']:6.2f}, Y:{tilt['y']:6.2f}, Z:{tilt['z']:6.2f}")
+        state = self._sensor_state
+        print(f"   📱 MPU6050 Tilt: X:{state[TILT_X]:6.2f}, Y:{state[TILT_Y]:6.2f}, Z:{state[TILT_Z]:6.2f}")
         mic = self.sensors['microphone']
-        print(f"   🎤 Microphone: {'🎤 LISTENING' if mic['listening'] else '🔇 IDLE'} (Vol: {mic['volume']:.0f}%)")
+        print(f"   🎤 Microphone: {'🎤 LISTENING' if mic['listening'] else '🔇 IDLE'} (Vol: {state[MIC_VOLUME]:.0f}%)")
         btn = self.sensors['button']
         print(f"   🔘 Button: {'🔴 PRESSED' if btn['pressed'] else '🟢 READY'} (Total presses: {btn['press_count']})")
         oled = self.sensors['oled']
@@ -176,12 +320,13 @@ class IoTDevice:
     
     def get_sensor_status(self):
         """Get current sensor status"""
+        self._refresh_sensors()
         return {
-            'tilt_x': self.sensors['mpu6050_tilt']['x'],
-            'tilt_y': self.sensors['mpu6050_tilt']['y'],
-            'tilt_z': self.sensors['mpu6050_tilt']['z'],
+            'tilt_x': float(self._sensor_state[TILT_X]),
+            'tilt_y': float(self._sensor_state[TILT_Y]),
+            'tilt_z': float(self._sensor_state[TILT_Z]),
             'mic_active': self.sensors['microphone']['listening'],
-            'mic_volume': self.sensors['microphone']['volume'],
+            'mic_volume': float(self._sensor_state[MIC_VOLUME]),
             'button_pressed': self.sensors['button']['pressed'],
             'oled_on': self.sensors['oled']['displaying'],
             'led_color': self.sensors['led']['color'],
@@ -1,266 +1,523 @@
 # main.py (fixed - only this file changed)
-import torch
+import asyncio
+import codecs
 import json
 import os
+import queue
 import sys
 import threading
 import time
-from iot.simulator import IoTDevice
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import MappingProxyType
 from utils import display_movies, get_user_ratings, clear_screen
 
+# MF.py / NCF.py import as top-level modules from deep_learning/, wherever main.py is run from
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deep_learning'))
 
-import serial
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+if os.name == 'nt':
+    import msvcrt
+else:
+    import termios
+    import tty
 
-ser = serial.Serial('COM6', 9600)   # Use your Arduino COM port
-time.sleep(2)                       # Wait 2 seconds for Arduino to reset
-print("✅ Serial Port Opened:", ser.name)
-print("🔍 Is port open?", ser.is_open)
+# torch takes seconds to import: load_ai_models imports it (and numpy) on first use
+torch = None
+np = None
+
+# Set once by _import_ai_modules(): None = not tried yet, then True/False for the process
+_AI_AVAILABLE = None
+_AI_ERR = None
+MFRecommender = NCFRecommender = None
+
+
+def _import_ai_modules():
+    """Import torch/numpy and the recommenders once per process; later calls are a flag check"""
+    global torch, np, MFRecommender, NCFRecommender, _AI_AVAILABLE, _AI_ERR
+    if _AI_AVAILABLE is None:
+        try:
+            import numpy as np
+            import torch
+            from MF import MFRecommender
+            from NCF import NCFRecommender
+            _AI_AVAILABLE = True
+        except Exception as e:
+            _AI_AVAILABLE, _AI_ERR = False, e
+    return _AI_AVAILABLE
+
+
+# Users scored once at startup to trigger lazy init / compilation / kernel autotuning
+_WARMUP_USER_IDS = (0,)
+
+# Retrain after a rating session only once this many new ratings piled up,
+# or once the models are this many seconds behind
+TRAIN_MIN_NEW_RATINGS = 3
+TRAIN_MAX_STALENESS = 30.0
+
+# Jaccard distance between the cached-for and current ratings above which cached recs are dropped
+RECO_CACHE_MAX_DRIFT = 0.10
+
+# Static "popular" picks used whenever the models are unavailable (built once, read-only)
+_FALLBACK_RECS = (
+    MappingProxyType({'id': 1, 'title': 'Toy Story', 'genres': 'Animation|Children|Comedy', 'score': 4.8, 'model': 'Popular'}),
+    MappingProxyType({'id': 50, 'title': 'The Usual Suspects', 'genres': 'Crime|Mystery|Thriller', 'score': 4.7, 'model': 'Popular'}),
+    MappingProxyType({'id': 100, 'title': 'Fargo', 'genres': 'Comedy|Crime|Drama', 'score': 4.9, 'model': 'Popular'}),
+)
+
+# Movies offered for rating - actual movie IDs from the dataset (popular movies from MovieLens)
+_SEED_MOVIES = (
+    MappingProxyType({'id': 1, 'title': 'Toy Story', 'genres': 'Animation|Children|Comedy'}),
+    MappingProxyType({'id': 50, 'title': 'The Usual Suspects', 'genres': 'Crime|Mystery|Thriller'}),
+    MappingProxyType({'id': 100, 'title': 'Fargo', 'genres': 'Comedy|Crime|Drama|Thriller'}),
+    MappingProxyType({'id': 150, 'title': 'Apollo 13', 'genres': 'Adventure|Drama|IMAX'}),
+    MappingProxyType({'id': 200, 'title': 'The Silence of the Lambs', 'genres': 'Crime|Horror|Thriller'}),
+    MappingProxyType({'id': 250, 'title': 'The Shawshank Redemption', 'genres': 'Drama'}),
+    MappingProxyType({'id': 300, 'title': 'Forrest Gump', 'genres': 'Comedy|Drama|Romance'}),
+    MappingProxyType({'id': 350, 'title': 'Pulp Fiction', 'genres': 'Comedy|Crime|Drama'}),
+)
+
+# Menus are rendered with a single write each instead of one print per line
+_MAIN_MENU = (
+    "\n🤖 SMARTFLIX - Welcome {user}!\n" + "=" * 40 + "\n"
+    "1. 🎯 Get Movie Recommendations\n"
+    "2. ⭐ Rate More Movies\n"
+    "3. 🎮 IoT Interactions\n"
+    "4. 📊 AI Model Comparison\n"
+    "0. 🚪 Exit\n" + "=" * 40 + "\n"
+)
+_IOT_MENU = (
+    "\n🎮 IOT INTERACTIONS\n" + "=" * 40 + "\n"
+    "1. 🎤 Voice Command\n"
+    "2. 📱 Tilt Gesture\n"
+    "3. 🔘 Button Press\n"
+    "4. 🔄 All Combined\n"
+    "0. ↩️  Back\n"
+)
+# Arduino serial lines (by prefix) that act as a menu keypress
+_MAIN_SERIAL_CHOICES = {"Button Pressed": '1'}
+_IOT_SERIAL_CHOICES = {"Button Pressed": '3', "Tilt Detected": '2'}
+
+# Screen headers, drawn together with the clear in one write
+_BANNERS = {
+    "startup": "🎬 SMARTFLIX - Movie Recommendation System\n" + "=" * 50 + "\n",
+    "login": "\n👤 USER LOGIN\n" + "-" * 30 + "\n",
+    "recs": "\n🎯 GETTING RECOMMENDATIONS\n" + "=" * 40 + "\n",
+    "rate": "\n⭐ RATE MOVIES\n" + "=" * 40 + "\n",
+    "voice": "\n🎤 VOICE COMMAND\n" + "=" * 30 + "\n",
+    "tilt": "\n📱 TILT GESTURE\n" + "=" * 30 + "\n",
+    "button": "\n🔘 BUTTON PRESS\n" + "=" * 30 + "\n",
+    "multi": "\n🔄 MULTI-SENSORY\n" + "=" * 30 + "\n",
+    "compare": "\n📊 AI MODEL COMPARISON\n" + "=" * 40 + "\n",
+}
+
+
+@dataclass(slots=True)
+class UserRec:
+    """In-memory user record (users.json entry without a per-user dict)"""
+    id: int
+    rated_movies: dict = field(default_factory=dict)
+    extra: dict = field(default_factory=dict)  # any other keys (e.g. created_at), written back as-is
 
 
 class SmartFlix:
     def __init__(self, model_timeout=8):
-        clear_screen()
-        print("🎬 SMARTFLIX - Movie Recommendation System")
-        print("=" * 50)
+        clear_screen(_BANNERS["startup"])
 
         # timeout (seconds) for model calls
         self.model_timeout = model_timeout
-
-        # Initialize IoT Device
-        self.iot_device = IoTDevice()
+        # one worker thread for all model work, so training and inference never overlap
+        self._model_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reco",
+                                              initializer=self._init_model_worker)
+        # serial reader task, started by main_menu on the event loop
+        self._iot_task = None
+        # keypresses read for menu prompts (created on the event loop by _read_choice)
+        self._keys = None
+        # startup warm-up queued on the model worker by load_ai_models
+        self._warmup_future = None
+
+        # Initialize IoT Device (imported here: pulls in numpy/numba/pyserial)
+        from iot.simulator import IoTDevice
+        self.iot_device = IoTDevice(port='COM6', baudrate=9600)   # Use your Arduino COM port
         self.iot_device.start()
+        # Interaction recording (simulated sensor delays) runs off the UI path
+        self._iot_q = queue.Queue()
+        self._iot_thread = threading.Thread(target=self._iot_worker, name="iot-events", daemon=True)
+        self._iot_thread.start()
 
         # Load AI Models
         self.load_ai_models()
         # Load users (fixed to be safe if file missing)
         self.load_users()
+        # users whose full ratings the models have already been trained on
+        self._model_synced_users = set()
+        # hash of the (user, ratings) the models were last updated with
+        self._last_updated_ratings_hash = None
+        # model picked from the rating count, refreshed whenever ratings change
+        self._preferred_model = "MF"
+        # (user_id, model, n) -> recommendations, valid for the ratings snapshot below;
+        # cleared only once ratings drift from it by more than RECO_CACHE_MAX_DRIFT
+        self._reco_cache = {}
+        self._rec_cache_ratings_snapshot = {}
+        # debounced training: ratings not yet trained on, and when training last ran
+        self._pending_delta = {}
+        self._ratings_since_train = 0
+        self._last_train_ts = time.monotonic()
 
         print("✅ System ready!")
 
     def load_ai_models(self):
         """Load deep learning models"""
         print("\n🧠 Loading AI models...")
+        if not _import_ai_modules():
+            print(f"❌ AI models not available: {_AI_ERR}")
+            self.ai_loaded = False
+            return
         try:
-            sys.path.append('./deep_learning')
-            from MF import MFRecommender
-            from NCF import NCFRecommender
+            self._configure_torch_threads()
+            # MF/NCF place their modules on this same device in load_model()
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            self._pin = self.device.type == 'cuda'
 
             self.mf_model = MFRecommender()
             self.ncf_model = NCFRecommender()
+            # Current user's ratings as a dense array indexed by movie id (0 = unrated)
+            self.user_ratings_arr = np.zeros(self.mf_model.num_items, dtype=np.int8)
             self.ai_loaded = True
             print("✅ AI models loaded!")
 
+            # Trace/compile both models in the background before the first real request;
+            # queued on the model worker so it can never overlap a user's call
+            print("🔥 Warming models in the background...")
+            self._warmup_future = self._model_exec.submit(self._warm_up_models)
+
         except Exception as e:
             print(f"❌ AI models not available: {e}")
             self.ai_loaded = False
 
+    @staticmethod
+    def _init_model_worker():
+        """Grad mode is per thread: the model worker only runs inference by default,
+        training re-enables grad itself (MF via inference_mode(False), NCF on its own trainer thread)"""
+        if torch is not None:
+            torch.set_grad_enabled(False)
+
+    @staticmethod
+    def _configure_torch_threads():
+        """Size torch's thread pools for tiny bs=1 forwards (before any tensor op)"""
+        if os.getenv("SMARTFLIX_LOW_LATENCY"):
+            intra = 1
+        else:
+            intra = max(1, (os.cpu_count() or 2) // 2)  # ~physical cores
+        try:
+            torch.set_num_threads(intra)
+            # only settable once, before inter-op parallel work starts
+            torch.set_num_interop_threads(1)
+        except RuntimeError as e:
+            print(f"⚠️ Could not set torch thread counts: {e}")
+
+    def _warm_up_models(self):
+        """Run throwaway predictions per model so compile/kernel caches are ready"""
+        try:
+            with torch.inference_mode():
+                for warmup_id in _WARMUP_USER_IDS:
+                    self.mf_model.get_recommendations(warmup_id, 3)
+                    self.ncf_model.get_recommendations(warmup_id, 3)
+        except Exception as e:
+            print(f"⚠️ Model warm-up failed (ignored): {e}")
+
     def load_users(self):
         """Load user data (robust against missing/corrupt file)"""
         self.users_data = {"user_id_counter": 10000, "users": {}}
+        self._users_dirty = False
         try:
             if os.path.exists('users.json'):
-                with open('users.json', 'r') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        self.users_data = data
+                with open('users.json', 'rb') as f:
+                    raw = f.read()
+                data = orjson.loads(raw) if orjson else json.loads(raw)
+                if isinstance(data, dict):
+                    self.users_data = data
         except Exception as e:
             print(f"⚠️ Could not load users.json (ignored): {e}")
 
-        # Ensure rated_movies are integers if present
-        try:
-            for username, user_data in self.users_data.get("users", {}).items():
-                if "rated_movies" in user_data:
-                    user_data["rated_movies"] = {int(k): int(v) for k, v in user_data["rated_movies"].items()}
-        except Exception as e:
-            print(f"⚠️ Error normalizing users data (ignored): {e}")
+        # Build UserRecs with rated_movies normalized to int -> int once; the rest of the app relies on it.
+        # Entries that don't parse are kept as-is in _raw_users so save_users() writes them back.
+        users = {}
+        self._raw_users = {}
+        raw_users = self.users_data.get("users")
+        for username, user_data in (raw_users.items() if isinstance(raw_users, dict) else ()):
+            try:
+                rated = user_data.get("rated_movies") or {}
+                extra = {k: v for k, v in user_data.items() if k not in ("id", "rated_movies")}
+                users[username] = UserRec(int(user_data["id"]),
+                                          dict(zip(map(int, rated.keys()), map(int, rated.values()))),
+                                          extra)
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable user {username!r} (kept in users.json): {e}")
+                self._raw_users[username] = user_data
+        self.users_data["users"] = users
 
     def save_users(self):
-        """Save user data"""
+        """Save user data if it changed (single buffered write + atomic rename)"""
+        if not self._users_dirty:
+            return
         try:
-            with open('users.json', 'w') as f:
-                json.dump(self.users_data, f, indent=2)
+            data = dict(self.users_data)
+            data["users"] = dict(self._raw_users)
+            data["users"].update((u, {"id": r.id, "rated_movies": r.rated_movies, **r.extra})
+                                 for u, r in self.users_data["users"].items())
+            if orjson:
+                buf = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                buf = json.dumps(data, indent=2).encode()
+            with open('users.json.tmp', 'wb', buffering=1 << 16) as f:
+                f.write(buf)
+            os.replace('users.json.tmp', 'users.json')
+            self._users_dirty = False
         except Exception as e:
             print(f"⚠️ Could not save users.json: {e}")
 
     def get_or_create_user(self, username):
         """Get existing user or create new one"""
-        if username in self.users_data["users"]:
-            user_data = self.users_data["users"][username]
-            rated_movies = user_data.get("rated_movies", {})
-            rated_movies = {int(k): int(v) for k, v in rated_movies.items()}
-            return user_data["id"], rated_movies
+        rec = self.users_data["users"].get(username)
+        if rec is not None:
+            return rec.id, rec.rated_movies
         else:
             user_id = self.users_data["user_id_counter"]
             self.users_data["user_id_counter"] += 1
-            self.users_data["users"][username] = {"id": user_id, "rated_movies": {}}
+            rec = self.users_data["users"][username] = UserRec(user_id)
+            self._users_dirty = True
             self.save_users()
-            return user_id, {}
+            return user_id, rec.rated_movies
 
-    # ---------- helper: run function with timeout ----------
-    def _run_with_timeout(self, target, args=(), timeout=8):
-        """Run target(*args) in a thread and return result or None on timeout/exception."""
-        result_container = {"ok": False, "result": None, "error": None}
+    # ---------- helpers: blocking work off the event loop ----------
+    def _record_iot(self, event):
+        """Print an interaction's feedback now; queue its simulated sensor work for _iot_worker"""
+        if isinstance(event, tuple):
+            self.iot_device.announce_interactions(event)
+        else:
+            self.iot_device.announce_interaction(event)
+        self._iot_q.put(event)
 
-        def runner():
+    def _iot_worker(self):
+        """Record queued IoT events silently: a name, or a tuple of names for one batched pass"""
+        while True:
+            event = self._iot_q.get()
+            if event is None:
+                return
             try:
-                res = target(*args)
-                result_container["ok"] = True
-                result_container["result"] = res
+                if isinstance(event, tuple):
+                    self.iot_device.record_interactions(list(event), verbose=False)
+                else:
+                    self.iot_device.record_interaction(event, verbose=False)
             except Exception as e:
-                result_container["error"] = e
-
-        thread = threading.Thread(target=runner)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout)
-        if thread.is_alive():
-            # still running -> timeout
-            return None, TimeoutError(f"Function timed out after {timeout}s")
-        if result_container["error"] is not None:
-            return None, result_container["error"]
-        if result_container["ok"]:
-            return result_container["result"], None
-        return None, Exception("Unknown error in thread")
+                print(f"⚠️ IoT event {event!r} failed: {e}")
+
+    @staticmethod
+    def _infer(target, *args):
+        """Call target(*args) without autograd (grad mode is per thread)"""
+        with torch.inference_mode():
+            return target(*args)
+
+    async def _call_model(self, target, *args):
+        """target(*args) without autograd on the model worker, bounded by the model timeout.
+        A timed-out call is abandoned, not stopped: it finishes on the worker before the next one."""
+        if self._warmup_future is not None:
+            # the first call queues behind the warm-up; don't bill its compile time to the timeout
+            await asyncio.wrap_future(self._warmup_future)
+            self._warmup_future = None
+        return await asyncio.wait_for(self._run_model(self._infer, target, *args),
+                                      timeout=self.model_timeout)
+
+    def _run_model(self, fn, *args):
+        """Awaitable for fn(*args) on the model worker"""
+        return asyncio.get_running_loop().run_in_executor(self._model_exec, fn, *args)
+
+    async def _stdin_call(self, fn, *args):
+        """Run a stdin-reading call on a daemon thread so the loop keeps serving serial
+        events, and Ctrl+C at a prompt never has to wait for the read to return"""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def settle(ok, value):
+            if not fut.done():
+                (fut.set_result if ok else fut.set_exception)(value)
+
+        def worker():
+            try:
+                res, ok = fn(*args), True
+            except BaseException as e:
+                res, ok = e, False
+            try:
+                loop.call_soon_threadsafe(settle, ok, res)
+            except RuntimeError:
+                pass  # loop already closed
+
+        threading.Thread(target=worker, name="stdin", daemon=True).start()
+        return await fut
+
+    async def _ainput(self, prompt=""):
+        """Async input()"""
+        return await self._stdin_call(input, prompt)
 
     # ---------- main menu and flows (unchanged except debug & safe model calls) ----------
-    def main_menu(self):
+    async def main_menu(self):
         """Main terminal interface"""
-        clear_screen()
-        print("\n👤 USER LOGIN")
-        print("-" * 30)
-        username = input("Enter your username: ").strip()
+        self._iot_task = asyncio.create_task(self.iot_device.run())
+        clear_screen(_BANNERS["login"])
+        username = (await self._ainput("Enter your username: ")).strip()
         if not username:
             username = "guest"
 
         user_id, user_ratings = self.get_or_create_user(username)
+        self._update_preferred_model(user_ratings)
+        self._rec_cache_ratings_snapshot = dict(user_ratings)
+        if self.ai_loaded:
+            self._fill_ratings_array(user_ratings)
 
         # For new users, ask for ratings first
         if not user_ratings:
             print(f"\n👋 Welcome {username}! Let's get to know your taste.")
-            user_ratings = self.rate_movies(username, user_id, user_ratings)
+            user_ratings = await self.rate_movies(username, user_id, user_ratings)
 
         while True:
-            clear_screen()
-            print(f"\n🤖 SMARTFLIX - Welcome {username}!")
-            print("=" * 40)
-            print("1. 🎯 Get Movie Recommendations")
-            print("2. ⭐ Rate More Movies")
-            print("3. 🎮 IoT Interactions")
-            print("4. 📊 AI Model Comparison")
-            print("0. 🚪 Exit")
-            print("=" * 40)
-
-            choice = input("\nEnter choice (0-4): ").strip()
+            clear_screen(_MAIN_MENU.format(user=username))
+
+            choice = await self._read_choice("\nEnter choice (0-4): ", "01234", _MAIN_SERIAL_CHOICES)
 
             if choice == '1':
-                self.get_recommendations(user_id, user_ratings)
+                await self.get_recommendations(user_id, user_ratings)
             elif choice == '2':
-                user_ratings = self.rate_movies(username, user_id, user_ratings)
+                user_ratings = await self.rate_movies(username, user_id, user_ratings)
             elif choice == '3':
-                self.iot_interactions(user_id, user_ratings)
+                await self.iot_interactions(user_id, user_ratings)
             elif choice == '4':
-                self.compare_models(user_id, user_ratings)
+                await self.compare_models(user_id, user_ratings)
             elif choice == '0':
-                self.shutdown()
+                await self.shutdown()
                 break
             else:
                 print("❌ Invalid choice")
-                input("Press Enter to continue...")
+                await self._ainput("Press Enter to continue...")
+
+    @staticmethod
+    def _serial_choice(line, serial_choices):
+        """Menu choice mapped from an Arduino line, or None"""
+        for prefix, choice in serial_choices.items():
+            if line.startswith(prefix):
+                return choice
+        return None
+
+    @staticmethod
+    async def _poll_keys(keys):
+        """Windows has no stdin reader on the event loop: poll the console instead"""
+        while True:
+            while msvcrt.kbhit():
+                keys.put_nowait(msvcrt.getwch())
+            await asyncio.sleep(0.02)
 
-    def get_recommendations(self, user_id, user_ratings):
-        """Get personalized recommendations - SHOW TOP 3 MOVIES"""
-        clear_screen()
-        print("\n🎯 GETTING RECOMMENDATIONS")
-        print("=" * 40)
+    async def _read_choice(self, prompt, valid, serial_choices=None):
+        """Single keypress menu choice; Arduino events can answer it too"""
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        if not sys.stdin.isatty():
+            return (await self._ainput()).strip()
+
+        loop = asyncio.get_running_loop()
+        if self._keys is None:
+            self._keys = asyncio.Queue()
+        keys = self._keys  # shared across prompts: keys typed ahead go to the next menu
+        events = self.iot_device.events if serial_choices else None
+        if events is not None:
+            while not events.empty():
+                events.get_nowait()  # ignore presses from before this prompt
+
+        if os.name == 'nt':
+            poller = asyncio.create_task(self._poll_keys(keys))
+        else:
+            fd = sys.stdin.fileno()
+            old = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+            # Read the raw fd: sys.stdin's buffer could hold pasted keys that never
+            # trigger another readiness callback
+            decoder = codecs.getincrementaldecoder(sys.stdin.encoding or 'utf-8')(errors='replace')
 
-        # Ensure ratings are integers
-        user_ratings = {int(k): int(v) for k, v in user_ratings.items()}
+            def on_readable():
+                for ch in decoder.decode(os.read(fd, 64)):
+                    keys.put_nowait(ch)
+
+            loop.add_reader(fd, on_readable)
+
+        key_get = asyncio.ensure_future(keys.get())
+        event_get = asyncio.ensure_future(events.get()) if events is not None else None
+        try:
+            while True:
+                waiting = {key_get} if event_get is None else {key_get, event_get}
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                choice = None
+                if key_get in done:
+                    ch = key_get.result()
+                    if ch in valid:
+                        choice = ch
+                    key_get = asyncio.ensure_future(keys.get())
+                if event_get is not None and event_get in done:
+                    choice = choice or self._serial_choice(event_get.result(), serial_choices)
+                    event_get = asyncio.ensure_future(events.get())
+                if choice is not None:
+                    print(choice)
+                    return choice
+        finally:
+            key_get.cancel()
+            if event_get is not None:
+                event_get.cancel()
+            if os.name == 'nt':
+                poller.cancel()
+            else:
+                loop.remove_reader(fd)
+                termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+    async def get_recommendations(self, user_id, user_ratings):
+        """Get personalized recommendations - SHOW TOP 3 MOVIES"""
+        clear_screen(_BANNERS["recs"])
 
         # UPDATE MODELS WITH USER RATINGS BEFORE GETTING RECOMMENDATIONS
-        if self.ai_loaded and user_ratings:
+        ratings_hash = self._ratings_hash(user_id, user_ratings)
+        if self.ai_loaded and user_ratings and ratings_hash != self._last_updated_ratings_hash:
             print("🔄 Updating AI models with your ratings...")
             try:
                 # keep model logic unchanged
-                self.mf_model.update_user_ratings(user_id, user_ratings)
-                self.ncf_model.update_user_ratings(user_id, user_ratings)
+                await self._run_model(self._update_models, user_id, user_ratings)
+                self._model_synced_users.add(user_id)
+                self._mark_trained(ratings_hash, user_ratings)
                 print("✅ Models updated successfully!")
             except Exception as e:
                 print(f"⚠️  Error updating models: {e}")
                 print("Using fallback recommendations...")
 
-        # Choose model based on user ratings
-        if len(user_ratings) >= 3:
+        # Model is chosen from the rating count whenever ratings change
+        model_type = self._preferred_model
+        if model_type == "NCF":
             print("🧠 Using Neural CF (you have enough ratings)")
-            model_type = "NCF"
         else:
             print("⚡ Using Matrix Factorization (good start!)")
-            model_type = "MF"
 
         # Record interaction (keeps original behaviour)
-        self.iot_device.record_interaction("button_press")
+        self._record_iot("button_press")
 
-        # ---------- DEBUG + safe model call ----------
+        # ---------- safe model call ----------
         print("📡 Getting movies...")
+        if self.ai_loaded:
+            print(f"⚙️ Calling {model_type} model (with timeout)...")
+        recommendations = await self._safe_recommend(model_type, user_id)
 
-        print("DEBUG: calling get_recommendations()")
-
-        try:
-            movies = recommender.get_recommendations(username)
-            print("DEBUG: recommendation function returned successfully.")
-            print("Recommended movies:", movies)
-        except Exception as e:
-            print("❌ ERROR inside get_recommendations:", e)
-
-
-
-
-
-
-
-
-
-        sys.stdout.flush()
-        recommendations = None
-
-        if not self.ai_loaded:
-            recommendations = self._get_fallback_recommendations()
-        else:
-            # call model with timeout to avoid hanging
-            try:
-                if model_type == "MF":
-                    print("⚙️ Calling MF model (with timeout)...")
-                    sys.stdout.flush()
-                    res, err = self._run_with_timeout(self.mf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                    if err:
-                        print(f"❌ MF call failed/timeout: {err}")
-                        recommendations = self._get_fallback_recommendations()
-                    else:
-                        recommendations = res
-                        print("✅ MF returned results")
-                else:
-                    print("⚙️ Calling NCF model (with timeout)...")
-                    sys.stdout.flush()
-                    res, err = self._run_with_timeout(self.ncf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                    if err:
-                        print(f"❌ NCF call failed/timeout: {err}")
-                        recommendations = self._get_fallback_recommendations()
-                    else:
-                        recommendations = res
-                        print("✅ NCF returned results")
-            except Exception as e:
-                print(f"❌ Error getting {model_type} recommendations (outer): {e}")
-                recommendations = self._get_fallback_recommendations()
-
-        # Safety: ensure recommendations is a list of dicts
-        if not isinstance(recommendations, list) or not recommendations:
-            print("⚠️ Model returned no recommendations or invalid format — using fallback")
-            recommendations = self._get_fallback_recommendations()
-
-        print(f"\n🎬 TOP {min(3, len(recommendations))} RECOMMENDATIONS FOR YOU ({model_type}):")
+        print(f"\n🎬 TOP {len(recommendations)} RECOMMENDATIONS FOR YOU ({model_type}):")
         print("=" * 50)
         try:
-            display_movies(recommendations[:3])
+            display_movies(recommendations)
         except Exception as e:
             print(f"❌ Error displaying movies: {e}")
             # print raw data for debugging
@@ -273,240 +530,229 @@ class SmartFlix:
 
         self.iot_device.led_feedback("success")
 
-        input("\nPress Enter to continue...")
-
-    def rate_movies(self, username, user_id, user_ratings):
+        await self._ainput("\nPress Enter to continue...")
+
+    @staticmethod
+    def _ratings_hash(user_id, user_ratings):
+        """Cheap fingerprint of a user's ratings"""
+        return hash((user_id, frozenset(user_ratings.items())))
+
+    def _fill_ratings_array(self, user_ratings):
+        """Load a {movie_id: rating} dict into user_ratings_arr"""
+        arr = self.user_ratings_arr
+        arr[:] = 0
+        for movie_id, rating in user_ratings.items():
+            if movie_id < len(arr):  # the models drop unknown movies anyway
+                arr[movie_id] = rating
+
+    def _build_rating_tensors(self, user_id):
+        """(users, items, ratings) CPU tensors built once for both models"""
+        arr = self.user_ratings_arr
+        ids = np.flatnonzero(arr).astype(np.int64, copy=False)
+        items = torch.from_numpy(ids)  # zero-copy view
+        users = torch.full_like(items, user_id)
+        ratings = torch.from_numpy(arr[ids].astype(np.float32))
+        if self._pin:
+            # page-locked so the models' non_blocking .to(device) copies run async
+            users, items, ratings = users.pin_memory(), items.pin_memory(), ratings.pin_memory()
+        return users, items, ratings
+
+    def _update_models(self, user_id, user_ratings):
+        """Full ratings update for MF and NCF from one shared set of tensors (model worker)"""
+        users, items, ratings = self._build_rating_tensors(user_id)
+        self.mf_model.update_user_ratings_tensors(user_id, user_ratings, users, items, ratings)
+        self.ncf_model.update_user_ratings_tensors(user_id, user_ratings, users, items, ratings)
+
+    def _mark_trained(self, ratings_hash, user_ratings):
+        """Record that the models now match these ratings"""
+        self._last_updated_ratings_hash = ratings_hash
+        # anything cached was scored by the models before this training pass
+        self._reco_cache.clear()
+        self._rec_cache_ratings_snapshot = dict(user_ratings)
+        self._pending_delta = {}
+        self._ratings_since_train = 0
+        self._last_train_ts = time.monotonic()
+
+    def _invalidate_reco_cache(self, user_ratings):
+        """Drop cached recs only if ratings moved materially since they were cached"""
+        old_set = set(self._rec_cache_ratings_snapshot.items())
+        new_set = set(user_ratings.items())
+        jaccard = len(old_set ^ new_set) / max(1, len(old_set | new_set))
+        if jaccard > RECO_CACHE_MAX_DRIFT:
+            self._reco_cache.clear()
+            self._rec_cache_ratings_snapshot = dict(user_ratings)
+
+    def _update_preferred_model(self, user_ratings):
+        """NCF once the user has enough ratings, MF before that"""
+        self._preferred_model = "NCF" if len(user_ratings) >= 3 else "MF"
+
+    async def rate_movies(self, username, user_id, user_ratings):
         """Rate movies to improve recommendations"""
-        clear_screen()
-        print("\n⭐ RATE MOVIES")
-        print("=" * 40)
+        clear_screen(_BANNERS["rate"])
 
         if not user_ratings:
             print("Let's rate some movies to personalize your experience!")
         else:
             print(f"You've rated {len(user_ratings)} movies. Rate more to improve!")
 
-        # Use actual movie IDs from the dataset (popular movies from MovieLens)
-        movies_to_rate = [
-            {'id': 1, 'title': 'Toy Story', 'genres': 'Animation|Children|Comedy'},
-            {'id': 50, 'title': 'The Usual Suspects', 'genres': 'Crime|Mystery|Thriller'},
-            {'id': 100, 'title': 'Fargo', 'genres': 'Comedy|Crime|Drama|Thriller'},
-            {'id': 150, 'title': 'Apollo 13', 'genres': 'Adventure|Drama|IMAX'},
-            {'id': 200, 'title': 'The Silence of the Lambs', 'genres': 'Crime|Horror|Thriller'},
-            {'id': 250, 'title': 'The Shawshank Redemption', 'genres': 'Drama'},
-            {'id': 300, 'title': 'Forrest Gump', 'genres': 'Comedy|Drama|Romance'},
-            {'id': 350, 'title': 'Pulp Fiction', 'genres': 'Comedy|Crime|Drama'}
-        ]
+        movies_to_rate = _SEED_MOVIES
 
         print("\n🎬 Movies to Rate:")
         for i, movie in enumerate(movies_to_rate, 1):
             print(f"{i}. {movie['title']}")
             print(f"   Genres: {movie['genres']}")
 
-        print("\nRate movies (1-8) or 'done' to finish:")
-        new_ratings = get_user_ratings()
+        print("\nRate movies 1-8 with 1-5 stars:")
+        new_ratings = await self._stdin_call(get_user_ratings)
 
         # Convert to actual movie IDs and ensure integers
+        delta = {}  # only the ratings added in this session
         for movie_num, rating in new_ratings.items():
             if 1 <= movie_num <= len(movies_to_rate):
                 movie_id = movies_to_rate[movie_num - 1]['id']
                 user_ratings[int(movie_id)] = int(rating)  # Ensure both are integers
+                delta[int(movie_id)] = int(rating)
+                if self.ai_loaded and movie_id < len(self.user_ratings_arr):
+                    self.user_ratings_arr[movie_id] = rating
                 print(f"✅ Rated '{movies_to_rate[movie_num - 1]['title']}' with {rating} stars")
 
         # Update user data
         if new_ratings:
-            self.users_data["users"][username]["rated_movies"] = user_ratings
+            self.users_data["users"][username].rated_movies = user_ratings
+            self._users_dirty = True
             self.save_users()
+            self._invalidate_reco_cache(user_ratings)
             print(f"✅ Saved {len(new_ratings)} ratings!")
 
-            # Update AI models with new ratings immediately
-            if self.ai_loaded and user_ratings:
+            self._update_preferred_model(user_ratings)
+
+            # Update AI models with new ratings (skip if nothing changed, debounce bursts)
+            self._pending_delta.update(delta)
+            self._ratings_since_train += len(delta)
+            ratings_hash = self._ratings_hash(user_id, user_ratings)
+            train_due = (self._ratings_since_train >= TRAIN_MIN_NEW_RATINGS
+                         or time.monotonic() - self._last_train_ts > TRAIN_MAX_STALENESS)
+            needs_update = self.ai_loaded and user_ratings and ratings_hash != self._last_updated_ratings_hash
+            if needs_update and not train_due:
+                # get_recommendations catches the models up if they are still behind
+                print("⏳ AI models will learn these ratings with your next few")
+            elif needs_update:
                 print("🔄 Training AI models with your new ratings...")
                 try:
-                    self.mf_model.update_user_ratings(user_id, user_ratings)
-                    self.ncf_model.update_user_ratings(user_id, user_ratings)
+                    if user_id in self._model_synced_users:
+                        # models already know the older ratings: train on the new ones only
+                        pending = self._pending_delta
+                        await self._run_model(self.mf_model.update_user_ratings_delta, user_id, pending)
+                        await self._run_model(self.ncf_model.update_user_ratings_delta, user_id, pending)
+                    else:
+                        await self._run_model(self._update_models, user_id, user_ratings)
+                        self._model_synced_users.add(user_id)
+                    self._mark_trained(ratings_hash, user_ratings)
                     print("✅ AI models updated successfully!")
                 except Exception as e:
                     print(f"⚠️  Error updating AI models: {e}")
                     print("But your ratings were saved!")
 
-            self.iot_device.record_interaction("voice_command")
+            self._record_iot("voice_command")
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
         return user_ratings
 
-    def iot_interactions(self, user_id, user_ratings):
+    async def iot_interactions(self, user_id, user_ratings):
         """IoT interaction menu"""
-        clear_screen()
-        print("\n🎮 IOT INTERACTIONS")
-        print("=" * 40)
-        print("1. 🎤 Voice Command")
-        print("2. 📱 Tilt Gesture")
-        print("3. 🔘 Button Press")
-        print("4. 🔄 All Combined")
-        print("0. ↩️  Back")
+        clear_screen(_IOT_MENU)
 
-        choice = input("\nEnter choice (0-4): ").strip()
+        choice = await self._read_choice("\nEnter choice (0-4): ", "01234", _IOT_SERIAL_CHOICES)
 
         if choice == '1':
-            self.voice_interaction(user_id, user_ratings)
+            await self.voice_interaction(user_id, user_ratings)
         elif choice == '2':
-            self.tilt_interaction(user_id, user_ratings)
+            await self.tilt_interaction(user_id, user_ratings)
         elif choice == '3':
-            self.button_interaction(user_id, user_ratings)
+            await self.button_interaction(user_id, user_ratings)
         elif choice == '4':
-            self.multi_sensory_interaction(user_id, user_ratings)
+            await self.multi_sensory_interaction(user_id, user_ratings)
         elif choice == '0':
             return
         else:
             print("❌ Invalid choice")
 
-    def voice_interaction(self, user_id, user_ratings):
+    async def voice_interaction(self, user_id, user_ratings):
         """Voice command interaction"""
-        clear_screen()
-        print("\n🎤 VOICE COMMAND")
-        print("=" * 30)
+        clear_screen(_BANNERS["voice"])
         print("Say: 'recommend action movies'")
 
-        self.iot_device.record_interaction("voice_command")
+        self._record_iot("voice_command")
         print("🎤 Processing voice command...")
 
         # Show recommendations - TOP 3 ONLY
-        if not self.ai_loaded:
-            recommendations = self._get_fallback_recommendations()[:3]
-        else:
-            try:
-                # safe call w/ timeout
-                res, err = self._run_with_timeout(self.mf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                if err:
-                    print(f"❌ Voice MF call failed: {err}")
-                    recommendations = self._get_fallback_recommendations()[:3]
-                else:
-                    recommendations = res
-            except Exception:
-                recommendations = self._get_fallback_recommendations()[:3]
+        recommendations = await self._safe_recommend("MF", user_id, label="Voice")
 
         print("\n🎬 Voice Recommendations:")
         display_movies(recommendations)
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
 
-    def tilt_interaction(self, user_id, user_ratings):
+    async def tilt_interaction(self, user_id, user_ratings):
         """Tilt gesture interaction"""
-        clear_screen()
-        print("\n📱 TILT GESTURE")
-        print("=" * 30)
+        clear_screen(_BANNERS["tilt"])
         print("Tilt device to navigate movies")
 
-        self.iot_device.record_interaction("tilt_gesture")
+        self._record_iot("tilt_gesture")
         print("📱 Navigating with tilt...")
 
-        if not self.ai_loaded:
-            recommendations = self._get_fallback_recommendations()[:3]
-        else:
-            try:
-                res, err = self._run_with_timeout(self.ncf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                if err:
-                    print(f"❌ Tilt NCF call failed: {err}")
-                    recommendations = self._get_fallback_recommendations()[:3]
-                else:
-                    recommendations = res
-            except Exception:
-                recommendations = self._get_fallback_recommendations()[:3]
+        recommendations = await self._safe_recommend("NCF", user_id, label="Tilt")
 
         print("\n🎬 Navigable Movies:")
         for i, movie in enumerate(recommendations, 1):
             print(f"{i}. {movie['title']}")
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
 
-    def button_interaction(self, user_id, user_ratings):
+    async def button_interaction(self, user_id, user_ratings):
         """Button press interaction"""
-        clear_screen()
-        print("\n🔘 BUTTON PRESS")
-        print("=" * 30)
+        clear_screen(_BANNERS["button"])
         print("Button pressed - refreshing recommendations")
 
-        self.iot_device.record_interaction("button_press")
+        self._record_iot("button_press")
 
-        if not self.ai_loaded:
-            recommendations = self._get_fallback_recommendations()[:3]
-        else:
-            try:
-                res, err = self._run_with_timeout(self.mf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                if err:
-                    print(f"❌ Button MF call failed: {err}")
-                    recommendations = self._get_fallback_recommendations()[:3]
-                else:
-                    recommendations = res
-            except Exception:
-                recommendations = self._get_fallback_recommendations()[:3]
+        recommendations = await self._safe_recommend("MF", user_id, label="Button")
 
         print("\n🎬 Fresh Recommendations:")
         display_movies(recommendations)
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
 
-    def multi_sensory_interaction(self, user_id, user_ratings):
+    async def multi_sensory_interaction(self, user_id, user_ratings):
         """Multi-sensory interaction"""
-        clear_screen()
-        print("\n🔄 MULTI-SENSORY")
-        print("=" * 30)
+        clear_screen(_BANNERS["multi"])
         print("Combining all sensors...")
 
         print("🎤 Voice: 'show best movies'")
-        self.iot_device.record_interaction("voice_command")
-
         print("📱 Tilt: browsing")
-        self.iot_device.record_interaction("tilt_gesture")
-
         print("🔘 Button: select")
-        self.iot_device.record_interaction("button_press")
-
         print("🔄 Processing...")
-        self.iot_device.record_interaction("multi_sensory")
+        self._record_iot(("voice_command", "tilt_gesture", "button_press", "multi_sensory"))
 
         # Enhanced recommendations - TOP 3 ONLY
-        if not self.ai_loaded:
-            recommendations = self._get_fallback_recommendations()[:3]
-        else:
-            try:
-                res, err = self._run_with_timeout(self.mf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-                if err:
-                    print(f"❌ Multi-sensory MF call failed: {err}")
-                    recommendations = self._get_fallback_recommendations()[:3]
-                else:
-                    recommendations = res
-            except Exception:
-                recommendations = self._get_fallback_recommendations()[:3]
+        recommendations = await self._safe_recommend("MF", user_id, label="Multi-sensory")
 
         print("\n🎬 Enhanced Recommendations:")
         display_movies(recommendations)
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
 
-    def compare_models(self, user_id, user_ratings):
+    async def compare_models(self, user_id, user_ratings):
         """Compare AI models - SHOW TOP 3 FROM EACH"""
-        clear_screen()
-        print("\n📊 AI MODEL COMPARISON")
-        print("=" * 40)
+        clear_screen(_BANNERS["compare"])
 
         if not self.ai_loaded:
             print("❌ AI models not available")
-            input("\nPress Enter to continue...")
+            await self._ainput("\nPress Enter to continue...")
             return
 
         try:
-            # safe calls
-            mf_recs, mf_err = self._run_with_timeout(self.mf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-            if mf_err:
-                print(f"❌ MF compare call failed: {mf_err}")
-                mf_recs = self._get_fallback_recommendations()[:3]
-
-            ncf_recs, ncf_err = self._run_with_timeout(self.ncf_model.get_recommendations, args=(user_id, 3), timeout=self.model_timeout)
-            if ncf_err:
-                print(f"❌ NCF compare call failed: {ncf_err}")
-                ncf_recs = self._get_fallback_recommendations()[:3]
+            mf_recs, ncf_recs = await self._batched_compare(user_id)
 
             print("⚡ Matrix Factorization (Top 3):")
             display_movies(mf_recs)
@@ -524,30 +770,85 @@ class SmartFlix:
         except Exception as e:
             print(f"❌ Error comparing models: {e}")
             print("Using fallback recommendations...")
-            fallback = self._get_fallback_recommendations()[:3]
+            fallback = self._get_fallback_recommendations()
             print("⚡ Fallback Recommendations:")
             display_movies(fallback)
 
-        input("\nPress Enter to continue...")
+        await self._ainput("\nPress Enter to continue...")
 
-    def shutdown(self):
+    async def shutdown(self):
         """Shutdown system"""
         print("\n🔄 Shutting down...")
+        self._model_exec.shutdown(wait=False)
+        self.save_users()
+        # let queued interactions finish recording before the device stops
+        self._iot_q.put(None)
+        self._iot_thread.join()
         self.iot_device.stop()
+        if self._iot_task is not None:
+            # the reader notices the stop flag after its current (0.1s) serial read
+            await self._iot_task
         print("🎬 Thank you for using SmartFlix!")
 
+    async def _safe_recommend(self, model_type, user_id, n=3, label=None):
+        """Top-n recommendations from MF or NCF, falling back to popular picks"""
+        if self.ai_loaded:
+            key = (user_id, model_type, n)
+            cached = self._reco_cache.get(key)
+            if cached is not None:
+                return cached
+            model = self.ncf_model if model_type == "NCF" else self.mf_model
+            prefix = f"{label} " if label else ""
+            try:
+                res = await self._call_model(model.get_recommendations, user_id, n)
+            except (asyncio.TimeoutError, TimeoutError):
+                print(f"❌ {prefix}{model_type} call failed: timed out after {self.model_timeout}s")
+            except Exception as e:
+                print(f"❌ {prefix}{model_type} call failed: {e}")
+            else:
+                if isinstance(res, list) and res:
+                    self._reco_cache[key] = res[:n]
+                    return res[:n]
+                print("⚠️ Model returned no recommendations or invalid format — using fallback")
+        return _FALLBACK_RECS[:n]  # no copy: the tuple and its mappings are read-only
+
+    async def _batched_compare(self, user_id, n=3):
+        """MF and NCF top-n in one model call: one worker hop, one timeout window"""
+        keys = ((user_id, "MF", n), (user_id, "NCF", n))
+        cached = [self._reco_cache.get(key) for key in keys]
+        if None not in cached:
+            return cached
+
+        results = (None, None)
+        try:
+            results = await self._call_model(self._recommend_both, user_id, n)
+        except (asyncio.TimeoutError, TimeoutError):
+            print(f"❌ Compare call failed: timed out after {self.model_timeout}s")
+        except Exception as e:
+            print(f"❌ Compare call failed: {e}")
+
+        recs = []
+        for key, res in zip(keys, results):
+            if isinstance(res, list) and res:
+                self._reco_cache[key] = res[:n]
+                recs.append(res[:n])
+            else:
+                recs.append(_FALLBACK_RECS[:n])
+        return recs
+
+    def _recommend_both(self, user_id, n):
+        """Runs on the model worker"""
+        return (self.mf_model.get_recommendations(user_id, n),
+                self.ncf_model.get_recommendations(user_id, n))
+
     def _get_fallback_recommendations(self):
         """Fallback recommendations"""
-        return [
-            {'id': 1, 'title': 'Toy Story', 'genres': 'Animation|Children|Comedy', 'score': 4.8, 'model': 'Popular'},
-            {'id': 50, 'title': 'The Usual Suspects', 'genres': 'Crime|Mystery|Thriller', 'score': 4.7, 'model': 'Popular'},
-            {'id': 100, 'title': 'Fargo', 'genres': 'Comedy|Crime|Drama', 'score': 4.9, 'model': 'Popular'}
-        ]
+        return _FALLBACK_RECS
 
 if __name__ == "__main__":
     try:
         smartflix = SmartFlix()
-        smartflix.main_menu()
+        asyncio.run(smartflix.main_menu())
     except KeyboardInterrupt:
         print("\n\n👋 Goodbye!")
     except Exception as e:
@@ -1,13 +1,40 @@
+import serial
 import serial.tools.list_ports
 
-ports = list(serial.tools.list_ports.comports())
-for port in ports:
-    print(f"Found port: {port.device}")
-    if "COM6" in port.device:
-        print(f"✅ Found possible ESP32 at: {port.device}")
-        try:
-            ser = serial.Serial(port.device, 115200)
+ESP32_PORT = "COM6"
+ESP32_BAUDRATE = 115200
+
+# Opened port, kept across open_esp32() calls instead of reopening every time
+_ser = None
+# Device found by find_esp32_port(); only a successful lookup is cached
+_esp32_device = None
+
+def find_esp32_port():
+    """List all ports and return the first matching ESP32_PORT (enumerating is slow on
+    Windows, so a match is cached; a miss is retried so a board plugged in later is found)"""
+    global _esp32_device
+    if _esp32_device is None:
+        for port in serial.tools.list_ports.comports():
+            print(f"Found port: {port.device}")
+            if _esp32_device is None and ESP32_PORT in port.device:
+                print(f"✅ Found possible ESP32 at: {port.device}")
+                _esp32_device = port.device
+    return _esp32_device
+
+def open_esp32():
+    """Open the ESP32 port once and reuse the handle"""
+    global _ser
+    if _ser is None or not _ser.is_open:
+        device = find_esp32_port()
+        if device is None:
+            return None
+        _ser = serial.Serial(device, ESP32_BAUDRATE)
+    return _ser
+
+if __name__ == "__main__":
+    try:
+        if open_esp32() is not None:
             print("✅ Successfully opened serial port!")
-            ser.close()
-        except Exception as e:
-            print("❌ Error:", e)
\ No newline at end of file
+            _ser.close()
+    except Exception as e:
+        print("❌ Error:", e)
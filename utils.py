@@ -1,40 +1,59 @@
 import os
 import platform
+import re
+import sys
 
-def clear_screen():
-    """Clear terminal screen"""
-    os.system('cls' if platform.system() == 'Windows' else 'clear')
+_CLEAR = "\x1b[2J\x1b[H"  # ANSI: clear screen + cursor home
+
+def _enable_vt_mode():
+    """Let the Windows console interpret ANSI escapes (already on everywhere else)"""
+    if platform.system() != 'Windows':
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
+_VT_ENABLED = _enable_vt_mode()
+
+def clear_screen(banner=""):
+    """Clear terminal screen and draw an optional banner in the same write"""
+    if not sys.stdout.isatty():
+        sys.stdout.write(banner)  # piped/redirected: keep escape codes out of the output
+        return
+    if not _VT_ENABLED:
+        os.system('cls')  # legacy console without ANSI support
+        sys.stdout.write(banner)
+        return
+    sys.stdout.write(_CLEAR + banner)
 
 def display_movies(movies):
-    """Display movies in a formatted way"""
-    for i, movie in enumerate(movies, 1):
-        print(f"{i}. {movie['title']}")
-        print(f"   🎭 Genres: {movie['genres']}")
-        print(f"   ⭐ Score: {movie['score']:.1f}")
-        print(f"   🤖 Model: {movie.get('model', 'Unknown')}")
-        print()
+    """Display movies in a formatted way (one write for the whole list)"""
+    sys.stdout.write(''.join(
+        f"{i}. {movie['title']}\n"
+        f"   🎭 Genres: {movie['genres']}\n"
+        f"   ⭐ Score: {movie['score']:.1f}\n"
+        f"   🤖 Model: {movie.get('model', 'Unknown')}\n\n"
+        for i, movie in enumerate(movies, 1)))
+
+# "movie:stars" pairs, e.g. "1:5, 3:4"
+_RATING_RE = re.compile(r'(\d+)\s*:\s*([1-5])\b')
 
 def get_user_ratings():
-    """Get movie ratings from user"""
+    """Get movie ratings from user in one line"""
+    line = input("Enter ratings as movie:stars (e.g. 1:5,3:4) or blank to skip: ")
     ratings = {}
-    
-    while True:
-        choice = input("Enter movie number (1-8) or 'done': ").strip().lower()
-        if choice == 'done':
-            break
-        
-        try:
-            movie_num = int(choice)
-            if 1 <= movie_num <= 8:
-                rating = input(f"Rate movie {movie_num} (1-5): ").strip()
-                if rating in ['1','2','3','4','5']:
-                    ratings[movie_num] = int(rating)
-                    print(f"✅ Rated {rating} stars")
-                else:
-                    print("❌ Please enter 1-5")
-            else:
-                print("❌ Please enter 1-8")
-        except:
-            print("❌ Please enter a number")
-    
-    return ratings
\ No newline at end of file
+    for movie, stars in _RATING_RE.findall(line):
+        movie_num = int(movie)
+        if 1 <= movie_num <= 8:
+            ratings[movie_num] = int(stars)
+    if line.strip() and not ratings:
+        print("❌ No valid ratings found (movie 1-8, stars 1-5)")
+    return ratings